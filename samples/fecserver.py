@@ -0,0 +1,38 @@
+import argparse
+import json
+import socket
+
+import httpc_udp
+
+
+def run_server(host, port, block_size):
+    conn = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        conn.bind((host, port))
+        print('FEC server is listening at', port)
+        while True:
+            # Wait until every block of a request was received or repaired
+            message = httpc_udp.fec_receive(conn)
+            print('New request from', message['peer'])
+            response = handle_request(message['data'])
+            # Answer through the same router with the client's message ID
+            httpc_udp.fec_send(conn, response, message['peer'], block_size or message['block_size'],
+                               message['message_id'], message['router'])
+    finally:
+        conn.close()
+
+
+def handle_request(data):
+    # Echo the request back so the client can see what the server rebuilt
+    body = json.dumps({'request': data.decode()})
+    return (f'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n{body}').encode()
+
+
+# Usage python fecserver.py [--port port-number] [--fec data-packets-per-parity]
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", help="fec server port", type=int, default=8007)
+    parser.add_argument("--fec", help="data packets per parity packet of the responses (defaults to the request's)", type=int)
+    args = parser.parse_args()
+    run_server('', args.port, args.fec)
@@ -0,0 +1,276 @@
+#############################################################################################
+# Written by:
+#   - Pierre-Olivier Trottier (40059235)
+#   - Nimit Jaggi (40032159)
+#############################################################################################
+
+import argparse
+import concurrent.futures
+import importlib
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+
+#############################################################################################
+# IMPORTANT NOTE:
+# This script requires Python 3.10 to work due to use of match/case statements
+#############################################################################################
+
+
+#############################################################################################
+# Library Implementation
+#############################################################################################
+
+
+# Client modules that can be benchmarked
+__TRANSPORTS = {
+    "tcp": "httpc_tcp",
+    "udp": "httpc_udp"
+}
+# Number of linear sub-buckets per power of two in the latency histograms (~1% precision)
+__HISTOGRAM_SUB_BUCKETS = 128
+# Maximum number of requests in flight per worker when running at a target rate
+__MAX_IN_FLIGHT = 64
+# Percentiles shown in the report
+__PERCENTILES = [50, 90, 99, 99.9]
+# Deadline of every request so a stalled server can't block a worker forever (in seconds)
+__REQUEST_TIMEOUT = 5
+
+
+def __histogram_index(value):
+    # Values are recorded in microseconds, the small ones are kept exact
+    if value < __HISTOGRAM_SUB_BUCKETS:
+        return value
+
+    # Bigger values are grouped in linear sub-buckets of their power of two
+    exponent = value.bit_length() - __HISTOGRAM_SUB_BUCKETS.bit_length()
+    return (exponent + 1) * __HISTOGRAM_SUB_BUCKETS + (value >> exponent) - __HISTOGRAM_SUB_BUCKETS
+
+
+def __histogram_value(index):
+    # Highest value that falls in the given bucket
+    if index < __HISTOGRAM_SUB_BUCKETS:
+        return index
+
+    exponent = index // __HISTOGRAM_SUB_BUCKETS - 1
+    return ((index % __HISTOGRAM_SUB_BUCKETS + __HISTOGRAM_SUB_BUCKETS + 1) << exponent) - 1
+
+
+def __record(histogram, latency):
+    index = __histogram_index(max(0, int(latency * 1_000_000)))
+    histogram[index] = histogram.get(index, 0) + 1
+
+
+def __merge(histograms):
+    merged = {}
+    for histogram in histograms:
+        for index, count in histogram.items():
+            merged[index] = merged.get(index, 0) + count
+    return merged
+
+
+def __percentile(histogram, percentile):
+    total = sum(histogram.values())
+    if not total:
+        return 0
+
+    # Walk the buckets in order until we reach the requested rank
+    rank = max(1, round(percentile / 100 * total))
+    count = 0
+    for index in sorted(histogram):
+        count += histogram[index]
+        if count >= rank:
+            return __histogram_value(index) / 1_000_000
+
+
+def __send(client, verb, url, body, timeout):
+    match verb:
+        case "GET":
+            client.get(url, timeout=timeout)
+        case "DELETE":
+            client.delete(url, timeout=timeout)
+        case "POST":
+            client.post(url, body, timeout=timeout)
+        case "PUT":
+            client.put(url, body, timeout=timeout)
+
+
+def __worker(transport, mix, duration, rate, concurrency, body, timeout, seed):
+    client = importlib.import_module(__TRANSPORTS[transport])
+    random.seed(seed)
+
+    histogram = {}
+    results = {"completed": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def run(verb, url, scheduled):
+        try:
+            __send(client, verb, url, body, timeout)
+            failed = False
+        # The UDP client exits on socket errors, count those as failed requests too
+        except (Exception, SystemExit):
+            failed = True
+
+        # Measure from the scheduled time so a stalled server can't hide its backlog
+        latency = time.monotonic() - scheduled
+        with lock:
+            if failed:
+                results["errors"] += 1
+            else:
+                results["completed"] += 1
+                __record(histogram, latency)
+
+    start = time.monotonic()
+    end = start + duration
+
+    if rate:
+        # Open loop: send at a fixed pace whether or not the previous requests completed
+        with concurrent.futures.ThreadPoolExecutor(max_workers=__MAX_IN_FLIGHT) as executor:
+            sent = 0
+            while True:
+                scheduled = start + sent / rate
+                if scheduled >= end:
+                    break
+                time.sleep(max(0.0, scheduled - time.monotonic()))
+                executor.submit(run, *random.choice(mix), scheduled)
+                sent += 1
+    else:
+        # Closed loop: every thread sends its next request as soon as the previous one completed
+        def loop():
+            while time.monotonic() < end:
+                run(*random.choice(mix), time.monotonic())
+
+        threads = [threading.Thread(target=loop) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    results["histogram"] = histogram
+    results["elapsed"] = time.monotonic() - start
+    return results
+
+
+def __split(total, parts):
+    # Spread a total as evenly as possible
+    return [total // parts + (1 if index < total % parts else 0) for index in range(parts)]
+
+
+def bench(mix, transport="tcp", duration=10, rate=None, concurrency=1, workers=None, body=None, verbose=False,
+          timeout=__REQUEST_TIMEOUT):
+    # The UDP client binds a fixed local port, so only one of its requests can be in flight
+    if transport == "udp" and (workers != 1 or rate or concurrency != 1):
+        raise ValueError("The UDP transport only supports --workers 1 with --concurrency 1")
+
+    workers = workers or os.cpu_count()
+    # A closed loop can't keep more workers busy than requests in flight
+    if not rate:
+        workers = min(workers, concurrency)
+
+    # Share the load between the worker processes
+    rates = [rate / workers] * workers if rate else [None] * workers
+    concurrencies = __split(concurrency, workers)
+
+    if verbose:
+        print(f"[INITIALIZE] Benchmark: {workers} workers, {transport.upper()} transport, {duration}s")
+
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.starmap(__worker, [
+            (transport, mix, duration, rates[index], concurrencies[index], body, timeout, index)
+            for index in range(workers)
+        ])
+
+    if verbose:
+        print(f"[SUCCESS] Benchmark: Merging {workers} worker reports")
+
+    histogram = __merge([result["histogram"] for result in results])
+    elapsed = max(result["elapsed"] for result in results)
+    completed = sum(result["completed"] for result in results)
+
+    return {
+        "workers": workers,
+        "completed": completed,
+        "errors": sum(result["errors"] for result in results),
+        "throughput": completed / elapsed if elapsed else 0,
+        "latency": {
+            f"p{percentile}": __percentile(histogram, percentile) for percentile in __PERCENTILES
+        } | {
+            "max": __histogram_value(max(histogram)) / 1_000_000 if histogram else 0
+        }
+    }
+
+
+#############################################################################################
+# CLI Tool Implementation
+#############################################################################################
+
+
+# Access a values by doing "args.transport" or "args.rate", etc.
+def __parse_flags():
+    parser = argparse.ArgumentParser(prog="httpc_bench")
+    parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    parser.add_argument("-t", "--transport", help="Client to benchmark", choices=__TRANSPORTS.keys(), default="tcp")
+    parser.add_argument("-R", "--request", help="Request of the mix using the following format: 'VERB URL'", action="append", required=True)
+    parser.add_argument("-D", "--inlinedata", help="Inline data sent in the body of POST and PUT requests")
+    parser.add_argument("-d", "--duration", help="Duration of the benchmark in seconds", type=float, default=10)
+    parser.add_argument("-w", "--workers", help="Number of worker processes (defaults to one per core)", type=int)
+    parser.add_argument("-T", "--timeout", help="Deadline in seconds for every request", type=float, default=__REQUEST_TIMEOUT)
+    load_group = parser.add_mutually_exclusive_group()
+    load_group.add_argument("-r", "--rate", help="Target requests per second across every worker", type=float)
+    load_group.add_argument("-c", "--concurrency", help="Requests in flight across every worker", type=int, default=1)
+
+    args = parser.parse_args()
+
+    # Validate request's format
+    args.mix = []
+    for request_arg in args.request:
+        request = request_arg.split(' ', 1)
+        if len(request) != 2 or request[0].upper() not in ["GET", "DELETE", "POST", "PUT"]:
+            print("[FAILED] Invalid request format. Input requests using the following format: 'VERB URL'")
+            sys.exit(1)
+        args.mix.append((request[0].upper(), request[1]))
+
+    # Validate the load settings
+    if args.duration <= 0 or args.timeout <= 0:
+        print("[FAILED] Invalid duration or timeout. Both must be greater than 0")
+        sys.exit(1)
+    if args.workers is not None and args.workers < 1:
+        print("[FAILED] Invalid workers. At least 1 worker is required")
+        sys.exit(1)
+    if args.rate is not None and args.rate <= 0:
+        print("[FAILED] Invalid rate. The rate must be greater than 0")
+        sys.exit(1)
+    if args.concurrency < 1:
+        print("[FAILED] Invalid concurrency. At least 1 request must be in flight")
+        sys.exit(1)
+
+    # The UDP client binds a fixed local port, so only one of its requests can be in flight
+    if args.transport == "udp" and (args.workers != 1 or args.rate or args.concurrency != 1):
+        print("[FAILED] The UDP transport only supports --workers 1 with --concurrency 1")
+        sys.exit(1)
+
+    return args
+
+
+def __print_report(report):
+    print(f"Workers:    {report['workers']}")
+    print(f"Completed:  {report['completed']}")
+    print(f"Errors:     {report['errors']}")
+    print(f"Throughput: {report['throughput']:.1f} req/s")
+    for name, value in report["latency"].items():
+        print(f"{name + ':':<11} {value * 1000:.3f} ms")
+
+
+# CLI Entry Point
+if __name__ == "__main__":
+    flags = __parse_flags()
+
+    if flags.verbose:
+        print(f"[ARGS] Benchmark Arguments: {flags}")
+
+    __print_report(bench(flags.mix, flags.transport, flags.duration, flags.rate, flags.concurrency,
+                         flags.workers, flags.inlinedata, flags.verbose, flags.timeout))
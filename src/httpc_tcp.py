@@ -5,14 +5,22 @@
 #############################################################################################
 
 import argparse
+import collections
+import concurrent.futures
 import io
 import json
 import mimetypes
+import mmap
 import os
 import pprint
+import queue
 import re
 import socket
+import ssl
 import sys
+import threading
+import time
+import urllib.parse
 from enum import Enum
 
 
@@ -32,31 +40,184 @@ class HttpVerb(Enum):
     DELETE = "DELETE"
     POST = "POST"
     PUT = "PUT"
+    HEAD = "HEAD"
+
+
+# Base error for any request that could not be completed
+class HttpError(Exception):
+    pass
+
+
+# Raised when a request did not complete before its deadline
+class HttpTimeoutError(HttpError):
+    pass
 
 
 # Connection ports
 __HTTP_PORT = 80
+__HTTPS_PORT = 443
+# Scheme of the URLs sent over a Unix domain socket (e.g. http+unix://%2Ftmp%2Fapp.sock/path)
+__UNIX_SCHEME = "http+unix"
+# Host header sent over a Unix domain socket since there is no hostname
+__UNIX_HOSTNAME = "localhost"
 # Socket buffer size
 __BUFFER_SIZE = 1
+# Hedging delay used until enough latency samples were collected (in seconds)
+__HEDGE_DEFAULT_DELAY = 0.5
+# Number of GET latency samples kept to compute the hedging delay
+__HEDGE_SAMPLE_SIZE = 100
+# Minimum number of samples before trusting the measured p95
+__HEDGE_MIN_SAMPLES = 10
+# Default number of concurrent connections used by segmented downloads
+__DOWNLOAD_SEGMENTS = 4
+# Suffix of the file keeping track of the progress of an incomplete download
+__DOWNLOAD_PROGRESS_SUFFIX = ".part"
+# Bytes read from the socket at once when a download can't be split
+__DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Bodies bigger than this (in bytes) wait for the server's approval before being uploaded
+__EXPECT_CONTINUE_THRESHOLD = 1024 * 1024
+# Time to wait for the interim response before uploading the body anyway (in seconds)
+__EXPECT_CONTINUE_TIMEOUT = 1
+
+# Recent GET latencies (in seconds) shared by every thread
+__latencies = collections.deque(maxlen=__HEDGE_SAMPLE_SIZE)
+__latencies_lock = threading.Lock()
+
+# One SSL context per configuration and the last TLS session of every host to resume it
+__tls_contexts = {}
+__tls_sessions = {}
+__tls_lock = threading.Lock()
+
+
+def __remaining(deadline):
+    # No deadline means blocking forever like a regular socket
+    if deadline is None:
+        return None
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise HttpTimeoutError("Request deadline exceeded")
+    return remaining
+
+
+def __record_latency(latency):
+    with __latencies_lock:
+        __latencies.append(latency)
+
+
+def __hedge_delay():
+    with __latencies_lock:
+        samples = sorted(__latencies)
+
+    # Not enough data to estimate the tail yet
+    if len(samples) < __HEDGE_MIN_SAMPLES:
+        return __HEDGE_DEFAULT_DELAY
+
+    # Nearest-rank 95th percentile
+    index = max(0, int(round(0.95 * len(samples))) - 1)
+    return samples[index]
+
+
+def __error_message(error):
+    # SSL errors reuse the errno field for their own codes
+    if isinstance(error, ssl.SSLError) or not error.errno:
+        return str(error)
+    return os.strerror(error.errno)
+
+
+def tls_context(cafile=None, verify=True):
+    # Building a context loads the certificate store, only do it once per configuration
+    with __tls_lock:
+        key = (cafile, verify)
+        if key not in __tls_contexts:
+            try:
+                context = ssl.create_default_context(cafile=cafile)
+            except OSError as error:
+                raise HttpError(f"Invalid CA certificates {cafile}: {__error_message(error)}") from error
+            if not verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            __tls_contexts[key] = context
+        return __tls_contexts[key]
+
+
+def __store_session(parsed, sock, context):
+    # TLS 1.3 tickets only arrive with the response, so save the session once it was read
+    if isinstance(sock, ssl.SSLSocket) and sock.session:
+        context = context or tls_context()
+        with __tls_lock:
+            __tls_sessions[(id(context), parsed['hostname'], parsed['port'])] = sock.session
 
 
 def __parse_url(url):
     # From URI RFC: https://datatracker.ietf.org/doc/html/rfc3986#appendix-B
     result = re.search('^(([^:/?#]+):)?(//([^/?#]*))?([^?#]*)(\?([^#]*))?(#(.*))?', url)
-    # Return the port here to allow for dynamic port selection based on the protocol later if we add SSL?
+
+    # The authority of a Unix domain socket URL is the percent-encoded socket path
+    if result.group(2) == __UNIX_SCHEME:
+        return {
+            "hostname": __UNIX_HOSTNAME,
+            "path": result.group(5),
+            "args": result.group(6),
+            "port": None,
+            "family": socket.AF_UNIX,
+            "address": urllib.parse.unquote(result.group(4))
+        }
+
+    # Pick the port based on the protocol unless it is in the URL
+    tls = result.group(2) == "https"
+    host = result.group(4)
+    port = __HTTPS_PORT if tls else __HTTP_PORT
+    if ':' in host:
+        connection = host.split(':')
+        host = connection[0]
+        port = int(connection[1])
+
     return {
-        "hostname": result.group(4),
+        "hostname": host,
         "path": result.group(5),
         "args": result.group(6),
-        "port": __HTTP_PORT
+        "port": port,
+        "family": socket.AF_INET,
+        "address": (host, port),
+        "tls": tls
     }
 
 
-def __receive_data(sock):
+def __connect(parsed, deadline=None, context=None):
+    # Same HTTP/1.1 stream whether it goes over TCP or a Unix domain socket
+    __socket = socket.socket(parsed['family'], socket.SOCK_STREAM)
+
+    try:
+        __socket.settimeout(__remaining(deadline))
+        __socket.connect(parsed['address'])
+
+        if parsed['family'] == socket.AF_INET:
+            # The request is sent in one write, don't let Nagle hold it behind the TLS handshake
+            __socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if parsed.get('tls'):
+            # Resume the previous session with this host to skip the full handshake
+            context = context or tls_context()
+            with __tls_lock:
+                session = __tls_sessions.get((id(context), parsed['hostname'], parsed['port']))
+            __socket.settimeout(__remaining(deadline))
+            __socket = context.wrap_socket(__socket, server_hostname=parsed['hostname'], session=session)
+    except BaseException:
+        __socket.close()
+        raise
+
+    return __socket
+
+
+def __receive_headers(sock, deadline=None, data=b''):
     # Read the socket data byte by byte until we reach the end of the headers
-    data = b''
     while b'\r\n\r\n' not in data:
-        data += sock.recv(__BUFFER_SIZE)
+        sock.settimeout(__remaining(deadline))
+        chunk = sock.recv(__BUFFER_SIZE)
+        if not chunk:
+            raise HttpError("Connection closed before the response headers were received")
+        data += chunk
 
     # Get a string from the header bytes without the empty lines
     header_data = data[:-4].decode()
@@ -70,15 +231,47 @@ def __receive_data(sock):
         header = string.split(': ')
         header_dictionary[header[0]] = header[1]
 
+    return data, header_dictionary
+
+
+def __status_code(data):
+    status = re.search(r'HTTP/\d+\.?\d* (\d+)', data.decode())
+    return status.group(1) if status else None
+
+
+def __is_interim(data):
+    # 1xx responses come before the final one, except 101 which switches protocols
+    status_code = __status_code(data)
+    return bool(status_code) and status_code.startswith("1") and status_code != "101"
+
+
+def __receive_data(sock, deadline=None, expect_body=True, received=None):
+    # The headers might already have been read while waiting for a 100 Continue
+    data, header_dictionary = received or __receive_headers(sock, deadline)
+
+    # A 100 Continue can still arrive after the body was sent, skip it like any other interim response
+    while __is_interim(data):
+        data, header_dictionary = __receive_headers(sock, deadline)
+
+    # HEAD responses advertise a Content-Length but never carry a body
+    if not expect_body:
+        return data
+
     # Create a dictionary from the headers
     content_length = None
     if 'Content-Length' in header_dictionary:
         content_length = int(header_dictionary.get('Content-Length'))
 
-    if content_length:
-        data += sock.recv(content_length)
+    # A single recv returns at most one TLS record, keep reading until the whole body arrived
+    body = b''
+    while content_length and len(body) < content_length:
+        sock.settimeout(__remaining(deadline))
+        chunk = sock.recv(content_length - len(body))
+        if not chunk:
+            raise HttpError("Connection closed before the response body was received")
+        body += chunk
 
-    return data
+    return data + body
 
 
 def __parse_response(data):
@@ -122,16 +315,100 @@ def __parse_response(data):
     }
 
 
-def __request(verb, url, header, body=None, file=None, verbose=False):
+def __build_request(verb, parsed, header, body=None, file=None):
+    # Make sure the path is valid
+    path = parsed['path'] if parsed['path'] else '/'
+    args = parsed['args'] if parsed['args'] else ''
+
+    # Build a URI from all the parts
+    content = f"{verb.value} {path}{args} HTTP/1.1\r\nHost: {parsed['hostname']}\r\n"
+
+    # If the headers are given add them after the hose
+    if header:
+        # If the headers are a dictionary add them nicely
+        if isinstance(header, dict):
+            for key in header:
+                content += f"{key}: {header[key]}\r\n"
+        # If we don't recognize the format just dump everything
+        else:
+            content += header
+
+    # If the request body is given calculate the content-length
+    # automatically and add the body after an empty line
+    if body or file:
+        if body:
+            if isinstance(body, dict):
+                json_body = json.dumps(body)
+                content += f"Content-Length: {len(json_body)}\r\n\r\n"
+                content += json_body + "\r\n"
+            else:
+                content += f"Content-Length: {len(body)}\r\n\r\n"
+                content += body + "\r\n"
+        if file:
+            if isinstance(file, io.BufferedReader):
+                file_type = mimetypes.guess_type(os.path.basename(file.name))[0]
+                file_content = file.read()
+                file.close()
+                content += f"Content-Length: {len(file_content)}\r\n"
+                content += f"Content-Type: {file_type}\r\n\r\n"
+                content += str(file_content) + "\r\n"
+            else:
+                raise IOError('Invalid file requested')
+    else:
+        content += "\r\n"
+
+    return content
+
+
+def __send_expecting_continue(sock, head, payload, deadline=None, verbose=False):
+    # Only send the headers and let the server reject the upload before it starts
+    sock.settimeout(__remaining(deadline))
+    sock.sendall(f"{head}\r\nExpect: 100-continue\r\n\r\n".encode())
+
+    # Servers that ignore the expectation never answer, so don't wait for them too long
+    wait = __EXPECT_CONTINUE_TIMEOUT
+    if deadline is not None:
+        wait = min(wait, __remaining(deadline))
+
+    # Wait for the first byte of the status line only, TLS records like session tickets don't count
+    sock.settimeout(wait)
+    try:
+        first = sock.recv(__BUFFER_SIZE)
+    except socket.timeout:
+        first = None
+
+    if first is None:
+        if verbose:
+            print(f"[EXPECT] No interim response after {wait}s, uploading anyway")
+    elif not first:
+        raise HttpError("Connection closed before the response headers were received")
+    else:
+        received = __receive_headers(sock, deadline, first)
+        # Other interim responses like 103 Early Hints can come before the 100 Continue
+        while __is_interim(received[0]) and __status_code(received[0]) != "100":
+            received = __receive_headers(sock, deadline)
+        # Anything but 100 Continue is the final response, the body is never sent
+        if __status_code(received[0]) != "100":
+            if verbose:
+                print(f"[EXPECT] Upload skipped: {received[0].decode().splitlines()[0]}")
+            return received
+
+    sock.settimeout(__remaining(deadline))
+    sock.sendall(payload)
+    return None
+
+
+def __request(verb, url, header, body=None, file=None, verbose=False, timeout=None, context=None,
+              expect_continue=None, sockets=None):
     # Make sure we're sending a valid request
     if not isinstance(verb, HttpVerb):
-        print("Invalid verb requested", verb)
-        sys.exit(1)
+        raise HttpError(f"Invalid verb requested {verb}")
 
-    if verbose:
-        print(f"[INITIALIZE] {verb.value} Request: Initializing Socket")
+    # The deadline covers the connect, send and receive phases as a whole
+    start = time.monotonic()
+    deadline = start + timeout if timeout is not None else None
 
-    __socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    __socket = None
 
     try:
         if verbose:
@@ -141,96 +418,382 @@ def __request(verb, url, header, body=None, file=None, verbose=False):
         parsed = __parse_url(url)
 
         if verbose:
+            print(f"[INITIALIZE] {verb.value} Request: Initializing Socket")
             print(f"[SENDING] {verb.value} Request:", parsed)
 
-        # Connect to the Host on the proper Port
-        __socket.connect((parsed['hostname'], parsed['port']))
+        # Connect to the Host on the proper Port (or to the socket file)
+        __socket = __connect(parsed, deadline, context)
 
-        # Make sure the path is valid
-        path = parsed['path'] if parsed['path'] else '/'
-        args = parsed['args'] if parsed['args'] else ''
+        # Let the caller abort the request from another thread
+        if sockets is not None:
+            sockets.append(__socket)
 
-        # Build a URI from all the parts
-        content = f"{verb.value} {path}{args} HTTP/1.1\r\nHost: {parsed['hostname']}\r\n"
+        if verbose and isinstance(__socket, ssl.SSLSocket):
+            print(f"[TLS] {verb.value} Request: {__socket.version()}, session reused: {__socket.session_reused}")
 
-        # If the headers are given add them after the hose
-        if header:
-            # If the headers are a dictionary add them nicely
-            if isinstance(header, dict):
-                for key in header:
-                    content += f"{key}: {header[key]}\r\n"
-            # If we don't recognize the format just dump everything
-            else:
-                content += header
-
-        # If the request body is given calculate the content-length
-        # automatically and add the body after an empty line
-        if body or file:
-            if body:
-                if isinstance(body, dict):
-                    json_body = json.dumps(body)
-                    content += f"Content-Length: {len(json_body)}\r\n\r\n"
-                    content += json_body + "\r\n"
-                else:
-                    content += f"Content-Length: {len(body)}\r\n\r\n"
-                    content += body + "\r\n"
-            if file:
-                if isinstance(file, io.BufferedReader):
-                    file_type = mimetypes.guess_type(os.path.basename(file.name))[0]
-                    file_content = file.read()
-                    file.close()
-                    content += f"Content-Length: {len(file_content)}\r\n"
-                    content += f"Content-Type: {file_type}\r\n\r\n"
-                    content += str(file_content) + "\r\n"
-                else:
-                    raise IOError('Invalid file requested')
-        else:
-            content += "\r\n"
+        # Build the raw HTTP request
+        content = __build_request(verb, parsed, header, body, file)
+        head, payload = content.split("\r\n\r\n", 1)
+        payload = payload.encode()
 
         # Send the Request to the URI
-        __socket.sendall(content.encode())
+        received = None
+        if expect_continue is not None and len(payload) > expect_continue:
+            received = __send_expecting_continue(__socket, head, payload, deadline, verbose)
+
+            # The server doesn't support the expectation, send everything again on a new connection
+            if received and __status_code(received[0]) == "417":
+                __socket.close()
+                __socket = __connect(parsed, deadline, context)
+                received = None
+                __socket.settimeout(__remaining(deadline))
+                __socket.sendall(content.encode())
+        else:
+            __socket.settimeout(__remaining(deadline))
+            __socket.sendall(content.encode())
 
         if verbose:
             print(f"[SENT] {verb.value} Request:\r\n\r\n{content}")
 
         # Receive the Request Response
-        data = __receive_data(__socket)
+        data = __receive_data(__socket, deadline, verb != HttpVerb.HEAD, received)
 
         if verbose:
             print(f"[SUCCESS] {verb.value} Request: Response Received")
 
+        __store_session(parsed, __socket, context)
         __socket.close()
 
         if verbose:
             print(f"[PARSING] {verb.value} Request: Parsing Response Data")
 
+        # Keep track of the GET latencies to tune the hedging delay
+        if verb == HttpVerb.GET:
+            __record_latency(time.monotonic() - start)
+
         # Return the response data
         return __parse_response(data.decode("utf-8"))
 
+    except socket.timeout as error:
+        raise HttpTimeoutError(f"{verb.value} Request timed out after {timeout} seconds") from error
+
     except socket.error as error:
-        print(f"[FAILED] {verb.value} Error:", os.strerror(error.errno))
-        sys.exit(1)
+        raise HttpError(f"{verb.value} Error: {__error_message(error)}") from error
 
     finally:
         if file:
             file.close()
-        __socket.close()
+        if __socket:
+            __socket.close()
+
+
+def __hedged_request(verb, url, header, verbose=False, timeout=None, context=None):
+    delay = __hedge_delay()
+    # Every attempt shares the deadline of the request, the duplicate doesn't get a fresh timeout
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    outcomes = queue.Queue()
+    sockets = []
+
+    def attempt():
+        try:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            outcomes.put((__request(verb, url, header, None, None, verbose, remaining, context, None, sockets), None))
+        # Any failure must be reported, otherwise the caller would wait for this attempt forever
+        except BaseException as error:
+            outcomes.put((None, error))
+
+    # Daemon threads so an attempt that never completes can't keep the process alive
+    def launch():
+        threading.Thread(target=attempt, daemon=True).start()
+
+    def wait(limit=None):
+        if deadline is not None:
+            limit = min(limit, deadline - time.monotonic()) if limit is not None else deadline - time.monotonic()
+        return outcomes.get(timeout=max(0.0, limit) if limit is not None else None)
+
+    launch()
+    attempts = 1
+
+    try:
+        # Only send the duplicate if the first request is slower than usual
+        try:
+            response, error = wait(delay)
+        except queue.Empty:
+            # A duplicate sent after the deadline could never complete in time
+            if deadline is None or time.monotonic() < deadline:
+                if verbose:
+                    print(f"[HEDGING] {verb.value} Request: No response after {delay:.3f}s, sending duplicate")
+                launch()
+                attempts += 1
+            response, error = wait()
+
+        # Take the first successful response, only fail once every attempt failed
+        finished = 1
+        while error and finished < attempts:
+            response, error = wait()
+            finished += 1
+
+    except queue.Empty:
+        raise HttpTimeoutError(f"{verb.value} Request timed out after {timeout} seconds") from None
+
+    finally:
+        # Abort the slower attempt, shutdown wakes up a thread blocked on the socket
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    if error:
+        raise error
+    return response
+
+
+def __load_progress(output, url, size, validator, segments):
+    progress_path = output + __DOWNLOAD_PROGRESS_SUFFIX
+
+    # Only resume the same version of the same resource, which requires an ETag or Last-Modified
+    if validator and os.path.exists(progress_path) and os.path.exists(output) and os.path.getsize(output) == size:
+        try:
+            with open(progress_path) as progress_file:
+                progress = json.load(progress_file)
+        except ValueError:
+            progress = {}
+        if (progress.get("url"), progress.get("size"), progress.get("validator")) == (url, size, validator):
+            return progress
+
+    # Otherwise split the resource in contiguous byte ranges
+    segment_size = -(-size // segments)
+    return {
+        "url": url,
+        "size": size,
+        "validator": validator,
+        "segments": [
+            {"start": start, "end": min(start + segment_size, size) - 1, "done": 0}
+            for start in range(0, size, segment_size)
+        ]
+    }
+
+
+def __save_progress(output, progress):
+    with open(output + __DOWNLOAD_PROGRESS_SUFFIX, "w") as progress_file:
+        json.dump(progress, progress_file)
+
+
+def __fetch_segment(parsed, header, buffer, segment, validator=None, verbose=False, timeout=None, context=None,
+                    sockets=None, cancelled=None):
+    start = segment["start"] + segment["done"]
+    end = segment["end"]
+
+    # Nothing left to download for this segment
+    if start > end:
+        return
+
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    __socket = None
+
+    try:
+        __socket = __connect(parsed, deadline, context)
+
+        # Let the download abort the segment from another thread
+        if sockets is not None:
+            sockets.append(__socket)
+
+        # Only ask for the bytes that are still missing, and only if the resource didn't change
+        range_fields = {"Range": f"bytes={start}-{end}"}
+        if validator:
+            range_fields["If-Range"] = validator
+        if isinstance(header, dict):
+            range_header = {**header, **range_fields}
+        else:
+            range_header = (header or "") + "".join(f"{key}: {value}\r\n" for key, value in range_fields.items())
+
+        content = __build_request(HttpVerb.GET, parsed, range_header)
+        __socket.settimeout(__remaining(deadline))
+        __socket.sendall(content.encode())
+
+        if verbose:
+            print(f"[SENT] {HttpVerb.GET.value} Segment: bytes {start}-{end}")
+
+        data, headers = __receive_headers(__socket, deadline)
+        if __status_code(data) != "206":
+            raise HttpError(f"{HttpVerb.GET.value} Error: Range not honoured for bytes {start}-{end}, "
+                            f"the resource may have changed")
+
+        # Make sure the server sent the exact bytes we asked for
+        if headers.get("Content-Range") != f"bytes {start}-{end}/{len(buffer)}":
+            raise HttpError(f"{HttpVerb.GET.value} Error: Unexpected Content-Range "
+                            f"{headers.get('Content-Range')} for bytes {start}-{end}")
+
+        # Write the socket data straight into the mapped output file
+        with memoryview(buffer)[start:end + 1] as view:
+            offset = 0
+            while offset < len(view):
+                if cancelled and cancelled.is_set():
+                    raise HttpError(f"{HttpVerb.GET.value} Error: Download cancelled during bytes {start}-{end}")
+                __socket.settimeout(__remaining(deadline))
+                received = __socket.recv_into(view[offset:])
+                if not received:
+                    raise HttpError(f"{HttpVerb.GET.value} Error: Connection closed during bytes {start}-{end}")
+                offset += received
+                segment["done"] += received
+
+        __store_session(parsed, __socket, context)
+
+        if verbose:
+            print(f"[SUCCESS] {HttpVerb.GET.value} Segment: bytes {start}-{end}")
 
+    except socket.timeout as error:
+        raise HttpTimeoutError(f"{HttpVerb.GET.value} Segment timed out after {timeout} seconds") from error
 
-def get(url, header=None, verbose=False):
-    return __request(HttpVerb.GET, url, header, None, None, verbose)
+    except socket.error as error:
+        raise HttpError(f"{HttpVerb.GET.value} Error: {__error_message(error)}") from error
+
+    finally:
+        if __socket:
+            __socket.close()
+
+
+def __download_whole(parsed, header, output, verbose=False, timeout=None, context=None):
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    __socket = None
+
+    try:
+        # Servers without range support get a single regular GET
+        __socket = __connect(parsed, deadline, context)
+        content = __build_request(HttpVerb.GET, parsed, header)
+        __socket.settimeout(__remaining(deadline))
+        __socket.sendall(content.encode())
 
+        if verbose:
+            print(f"[SENT] {HttpVerb.GET.value} Request:\r\n\r\n{content}")
+
+        data, headers = __receive_headers(__socket, deadline)
+        response = __parse_response(data.decode())
+        if response["status_code"] != "200":
+            raise HttpError(f"{HttpVerb.GET.value} Error: {response['status_code']} {response['status']}")
+
+        # Without a Content-Length the body ends when the server closes the connection
+        content_length = int(headers["Content-Length"]) if "Content-Length" in headers else None
+
+        # Stream the raw body to the file without ever holding it in memory
+        written = 0
+        with open(output, "wb") as output_file:
+            while content_length is None or written < content_length:
+                __socket.settimeout(__remaining(deadline))
+                size = __DOWNLOAD_CHUNK_SIZE if content_length is None else min(__DOWNLOAD_CHUNK_SIZE, content_length - written)
+                chunk = __socket.recv(size)
+                if not chunk:
+                    if content_length is None:
+                        break
+                    raise HttpError(f"{HttpVerb.GET.value} Error: Connection closed after {written} of {content_length} bytes")
+                output_file.write(chunk)
+                written += len(chunk)
+
+        __store_session(parsed, __socket, context)
+        return response
+
+    except socket.timeout as error:
+        raise HttpTimeoutError(f"{HttpVerb.GET.value} Request timed out after {timeout} seconds") from error
 
-def delete(url, header=None, verbose=False):
-    return __request(HttpVerb.DELETE, url, header, None, None, verbose)
+    except socket.error as error:
+        raise HttpError(f"{HttpVerb.GET.value} Error: {__error_message(error)}") from error
 
+    finally:
+        if __socket:
+            __socket.close()
 
-def post(url, body=None, file=None, header=None, verbose=False):
-    return __request(HttpVerb.POST, url, header, body, file, verbose)
 
+def download(url, output, header=None, segments=__DOWNLOAD_SEGMENTS, verbose=False, timeout=None, context=None):
+    # Find out the size of the resource and whether it can be split
+    response = __request(HttpVerb.HEAD, url, header, None, None, verbose, timeout, context)
+    if response["status_code"] != "200":
+        raise HttpError(f"{HttpVerb.HEAD.value} Error: {response['status_code']} {response['status']}")
+    headers = response["headers"]
+    size = int(headers.get("Content-Length", 0))
 
-def put(url, body=None, file=None, header=None, verbose=False):
-    return __request(HttpVerb.PUT, url, header, body, file, verbose)
+    if headers.get("Accept-Ranges") != "bytes" or size == 0:
+        if verbose:
+            print(f"[DOWNLOAD] {HttpVerb.GET.value} Request: Ranges unsupported, using a single connection")
+        # The whole file gets rewritten, an earlier segmented attempt can't be resumed anymore
+        if os.path.exists(output + __DOWNLOAD_PROGRESS_SUFFIX):
+            os.remove(output + __DOWNLOAD_PROGRESS_SUFFIX)
+        response = __download_whole(__parse_url(url), header, output, verbose, timeout, context)
+        response["body"] = output
+        return response
+
+    parsed = __parse_url(url)
+    # If-Range never matches a weak ETag, fall back to Last-Modified (or no validator at all)
+    etag = headers.get("ETag")
+    validator = etag if etag and not etag.startswith("W/") else headers.get("Last-Modified")
+    progress = __load_progress(output, url, size, validator, max(1, segments))
+    sockets = []
+    cancelled = threading.Event()
+
+    # Preallocate the output file so every segment can be written in place
+    mode = "r+b" if os.path.exists(output) else "w+b"
+    with open(output, mode) as output_file:
+        output_file.truncate(size)
+        with mmap.mmap(output_file.fileno(), size) as buffer:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(progress["segments"]))
+            try:
+                futures = [
+                    executor.submit(__fetch_segment, parsed, header, buffer, segment, validator, verbose, timeout,
+                                    context, sockets, cancelled)
+                    for segment in progress["segments"]
+                ]
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+            except BaseException:
+                # Stop the other segments, shutdown wakes up the threads blocked on their socket
+                cancelled.set()
+                for sock in sockets:
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                raise
+            finally:
+                # Keep what was downloaded so the next call only resumes the missing bytes
+                executor.shutdown(wait=True, cancel_futures=True)
+                buffer.flush()
+                if any(segment["start"] + segment["done"] <= segment["end"] for segment in progress["segments"]):
+                    __save_progress(output, progress)
+
+    # The download is complete, the progress file is no longer needed
+    if os.path.exists(output + __DOWNLOAD_PROGRESS_SUFFIX):
+        os.remove(output + __DOWNLOAD_PROGRESS_SUFFIX)
+
+    if verbose:
+        print(f"[SUCCESS] {HttpVerb.GET.value} Request: Downloaded {size} bytes to {output}")
+
+    response["body"] = output
+    return response
+
+
+def head(url, header=None, verbose=False, timeout=None, context=None):
+    return __request(HttpVerb.HEAD, url, header, None, None, verbose, timeout, context)
+
+
+def get(url, header=None, verbose=False, timeout=None, hedge=False, context=None):
+    # Only GET is hedged since it is idempotent and can safely be sent twice
+    if hedge:
+        return __hedged_request(HttpVerb.GET, url, header, verbose, timeout, context)
+    return __request(HttpVerb.GET, url, header, None, None, verbose, timeout, context)
+
+
+def delete(url, header=None, verbose=False, timeout=None, context=None):
+    return __request(HttpVerb.DELETE, url, header, None, None, verbose, timeout, context)
+
+
+def post(url, body=None, file=None, header=None, verbose=False, timeout=None, context=None,
+         expect_continue=__EXPECT_CONTINUE_THRESHOLD):
+    return __request(HttpVerb.POST, url, header, body, file, verbose, timeout, context, expect_continue)
+
+
+def put(url, body=None, file=None, header=None, verbose=False, timeout=None, context=None,
+        expect_continue=__EXPECT_CONTINUE_THRESHOLD):
+    return __request(HttpVerb.PUT, url, header, body, file, verbose, timeout, context, expect_continue)
 
 
 #############################################################################################
@@ -245,16 +808,29 @@ def __parse_flags():
 
     get_parser = subparsers.add_parser(HttpVerb.GET.value, help="GET request")
     get_parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    get_parser.add_argument("-T", "--timeout", help="Deadline in seconds for the whole request", type=float)
+    get_parser.add_argument("--cafile", help="CA certificates used to verify HTTPS servers")
+    get_parser.add_argument("-k", "--insecure", help="Don't verify the certificate of HTTPS servers", action="store_true")
     get_parser.add_argument("-H", "--headers", help="Headers to be sent using the following format: 'Key:Value'", action="append")
+    get_parser.add_argument("--hedge", help="Send a duplicate request if the response is slower than usual", action="store_true")
+    get_parser.add_argument("-O", "--output", help="Download the response body to a file using parallel range requests")
+    get_parser.add_argument("-S", "--segments", help="Number of concurrent connections used with --output", type=int, default=__DOWNLOAD_SEGMENTS)
     get_parser.add_argument("url", help="URL to point to for the request")
 
     delete_parser = subparsers.add_parser(HttpVerb.DELETE.value, help="DELETE request")
     delete_parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    delete_parser.add_argument("-T", "--timeout", help="Deadline in seconds for the whole request", type=float)
+    delete_parser.add_argument("--cafile", help="CA certificates used to verify HTTPS servers")
+    delete_parser.add_argument("-k", "--insecure", help="Don't verify the certificate of HTTPS servers", action="store_true")
     delete_parser.add_argument("-H", "--headers", help="Headers to be sent using the following format: 'Key:Value'", action="append")
     delete_parser.add_argument("url", help="URL to point to for the request")
 
     post_parser = subparsers.add_parser(HttpVerb.POST.value, help="POST request")
     post_parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    post_parser.add_argument("-T", "--timeout", help="Deadline in seconds for the whole request", type=float)
+    post_parser.add_argument("--cafile", help="CA certificates used to verify HTTPS servers")
+    post_parser.add_argument("-k", "--insecure", help="Don't verify the certificate of HTTPS servers", action="store_true")
+    post_parser.add_argument("-E", "--expect-continue", help="Wait for the server's approval before uploading bodies bigger than this many bytes", type=int, default=__EXPECT_CONTINUE_THRESHOLD)
     post_parser.add_argument("-H", "--headers", help="Headers to be sent using the following format: 'Key:Value'", action="append")
     post_data_group = post_parser.add_mutually_exclusive_group()
     post_data_group.add_argument("-D", "--inlinedata", help="Inline data to be sent in the request body")
@@ -263,6 +839,10 @@ def __parse_flags():
 
     put_parser = subparsers.add_parser(HttpVerb.PUT.value, help="PUT request")
     put_parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    put_parser.add_argument("-T", "--timeout", help="Deadline in seconds for the whole request", type=float)
+    put_parser.add_argument("--cafile", help="CA certificates used to verify HTTPS servers")
+    put_parser.add_argument("-k", "--insecure", help="Don't verify the certificate of HTTPS servers", action="store_true")
+    put_parser.add_argument("-E", "--expect-continue", help="Wait for the server's approval before uploading bodies bigger than this many bytes", type=int, default=__EXPECT_CONTINUE_THRESHOLD)
     put_parser.add_argument("-H", "--headers", help="Headers to be sent using the following format: 'Key:Value'", action="append")
     put_data_group = put_parser.add_mutually_exclusive_group()
     put_data_group.add_argument("-D", "--inlinedata", help="Inline data to be sent in the request body")
@@ -303,12 +883,21 @@ if __name__ == "__main__":
         print(f"[ARGS] {flags.verb} Arguments: {flags}")
 
     # Send the request
-    match flags.verb:
-        case HttpVerb.GET.value:
-            pprint.pprint(get(flags.url, header_content, flags.verbose))
-        case HttpVerb.DELETE.value:
-            pprint.pprint(delete(flags.url, header_content, flags.verbose))
-        case HttpVerb.POST.value:
-            pprint.pprint(post(flags.url, flags.inlinedata, flags.file, header_content, flags.verbose))
-        case HttpVerb.PUT.value:
-            pprint.pprint(put(flags.url, flags.inlinedata, flags.file, header_content, flags.verbose))
+    try:
+        # Only load the certificate store when the request actually uses TLS
+        context = tls_context(flags.cafile, not flags.insecure) if __parse_url(flags.url).get('tls') else None
+
+        match flags.verb:
+            case HttpVerb.GET.value if flags.output:
+                pprint.pprint(download(flags.url, flags.output, header_content, flags.segments, flags.verbose, flags.timeout, context))
+            case HttpVerb.GET.value:
+                pprint.pprint(get(flags.url, header_content, flags.verbose, flags.timeout, flags.hedge, context))
+            case HttpVerb.DELETE.value:
+                pprint.pprint(delete(flags.url, header_content, flags.verbose, flags.timeout, context))
+            case HttpVerb.POST.value:
+                pprint.pprint(post(flags.url, flags.inlinedata, flags.file, header_content, flags.verbose, flags.timeout, context, flags.expect_continue))
+            case HttpVerb.PUT.value:
+                pprint.pprint(put(flags.url, flags.inlinedata, flags.file, header_content, flags.verbose, flags.timeout, context, flags.expect_continue))
+    except HttpError as error:
+        print("[FAILED]", error)
+        sys.exit(1)
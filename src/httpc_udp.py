@@ -10,8 +10,10 @@ import json
 import mimetypes
 import os
 import pprint
+import random
 import re
 import socket
+import struct
 import sys
 from enum import Enum
 
@@ -34,6 +36,12 @@ class HttpVerb(Enum):
     PUT = "PUT"
 
 
+# Packet types of the FEC mode, the router forwards them without looking at them
+class PacketType(Enum):
+    DATA = 0
+    PARITY = 2
+
+
 # Local connection
 __LOCAL_HOSTNAME = "localhost"
 __LOCAL_PORT = 1338
@@ -41,6 +49,26 @@ __LOCAL_PORT = 1338
 __HTTP_PORT = 80
 # Socket buffer size
 __BUFFER_SIZE = 1024
+# Router connection used by the FEC mode
+__ROUTER_HOSTNAME = "localhost"
+__ROUTER_PORT = 3000
+# Router packet header: Type, Sequence Number, Peer Address and Peer Port
+__PACKET_HEADER = struct.Struct("!BI4sH")
+# FEC header: Message ID, Total data packets and data packets per parity block
+__FEC_HEADER = struct.Struct("!IHB")
+# Limits of the FEC header fields
+__FEC_MAX_BLOCK_SIZE = 255
+__FEC_MAX_PACKETS = 65535
+# Length prefix of each data chunk, protected by the parity like the data itself
+__FEC_LENGTH = struct.Struct("!H")
+# Largest chunk that still fits a parity packet in the router's 1024 bytes limit
+__FEC_CHUNK_SIZE = __BUFFER_SIZE - __PACKET_HEADER.size - __FEC_HEADER.size - __FEC_LENGTH.size
+# Time to wait for the missing packets of a response before giving up (in seconds)
+__FEC_TIMEOUT = 5
+# Largest request or response that fits in the FEC header's packet count
+__FEC_MAX_SIZE = __FEC_MAX_PACKETS * __FEC_CHUNK_SIZE
+# Incomplete messages a server keeps rebuilding at once
+__FEC_MAX_PENDING = 64
 
 
 def __parse_url(url):
@@ -64,9 +92,168 @@ def __parse_url(url):
     }
 
 
-def __receive_data(sock):
-    # Read the socket data byte by byte until we reach the end of the headers
-    data, address = sock.recvfrom(__BUFFER_SIZE)
+def __xor_into(parity, frame):
+    for index, byte in enumerate(frame):
+        parity[index] ^= byte
+
+
+def __fec_encode(data, peer, block_size, message_id):
+    if not 1 <= block_size <= __FEC_MAX_BLOCK_SIZE:
+        raise ValueError(f"FEC block size must be between 1 and {__FEC_MAX_BLOCK_SIZE}, got {block_size}")
+    if len(data) > __FEC_MAX_SIZE:
+        raise ValueError(f"FEC messages are limited to {__FEC_MAX_SIZE} bytes, got {len(data)}")
+
+    # Split the data in chunks small enough to fit a packet
+    chunks = [data[index:index + __FEC_CHUNK_SIZE] for index in range(0, len(data), __FEC_CHUNK_SIZE)] or [b'']
+    address = socket.inet_aton(peer[0])
+    fec_header = __FEC_HEADER.pack(message_id, len(chunks), block_size)
+
+    packets = []
+    for block_start in range(0, len(chunks), block_size):
+        # Every block of data packets is followed by the XOR of its (length prefixed) chunks
+        parity = bytearray(__FEC_LENGTH.size + __FEC_CHUNK_SIZE)
+        for sequence in range(block_start, min(block_start + block_size, len(chunks))):
+            frame = __FEC_LENGTH.pack(len(chunks[sequence])) + chunks[sequence]
+            __xor_into(parity, frame)
+            header = __PACKET_HEADER.pack(PacketType.DATA.value, sequence, address, peer[1])
+            packets.append(header + fec_header + frame)
+
+        header = __PACKET_HEADER.pack(PacketType.PARITY.value, block_start // block_size, address, peer[1])
+        packets.append(header + fec_header + bytes(parity))
+
+    return packets
+
+
+def __fec_unpack(packet):
+    # Stray datagrams are too short to carry both headers
+    if len(packet) < __PACKET_HEADER.size + __FEC_HEADER.size:
+        return None
+
+    packet_type, sequence, address, port = __PACKET_HEADER.unpack_from(packet)
+    message_id, total, block_size = __FEC_HEADER.unpack_from(packet, __PACKET_HEADER.size)
+    if not total or not block_size:
+        return None
+
+    return {
+        "type": packet_type,
+        "sequence": sequence,
+        "peer": (socket.inet_ntoa(address), port),
+        "message_id": message_id,
+        "total": total,
+        "block_size": block_size,
+        "payload": packet[__PACKET_HEADER.size + __FEC_HEADER.size:]
+    }
+
+
+def __fec_message(total, block_size):
+    return {"total": total, "block_size": block_size, "frames": {}, "parities": {}}
+
+
+def __fec_add(message, packet):
+    total, block_size = message["total"], message["block_size"]
+    frames, parities = message["frames"], message["parities"]
+
+    # Every packet of a message agrees on its layout, anything else is corrupted
+    if (packet["total"], packet["block_size"]) != (total, block_size):
+        return None
+
+    if packet["type"] == PacketType.DATA.value and packet["sequence"] < total:
+        frames[packet["sequence"]] = packet["payload"]
+        block = packet["sequence"] // block_size
+    elif packet["type"] == PacketType.PARITY.value and packet["sequence"] * block_size < total:
+        parities[packet["sequence"]] = packet["payload"]
+        block = packet["sequence"]
+    else:
+        return None
+
+    # Only the block of the new packet can change, rebuild its single missing packet from the parity
+    if block in parities:
+        block_sequences = range(block * block_size, min((block + 1) * block_size, total))
+        missing = [sequence for sequence in block_sequences if sequence not in frames]
+        if len(missing) == 1:
+            recovered = bytearray(parities[block])
+            for sequence in block_sequences:
+                if sequence in frames:
+                    __xor_into(recovered, frames[sequence])
+            length = __FEC_LENGTH.unpack_from(recovered)[0]
+            frames[missing[0]] = bytes(recovered[:__FEC_LENGTH.size + length])
+
+    # Still missing more than one packet in a block
+    if len(frames) < total:
+        return None
+
+    return b''.join(frames[sequence][__FEC_LENGTH.size:] for sequence in range(total))
+
+
+def __fec_decode(packets, message_id):
+    message = None
+
+    for packet in packets:
+        # Ignore stray datagrams and late packets of a previous message
+        fields = __fec_unpack(packet)
+        if fields is None or fields["message_id"] != message_id:
+            continue
+
+        message = message or __fec_message(fields["total"], fields["block_size"])
+        data = __fec_add(message, fields)
+        if data is not None:
+            return data
+
+    return None
+
+
+def fec_send(sock, data, peer, block_size, message_id, router=None):
+    # Both ends go through the router, which forwards every packet to the peer in its header
+    for packet in __fec_encode(data, peer, block_size, message_id):
+        sock.sendto(packet, router or (__ROUTER_HOSTNAME, __ROUTER_PORT))
+
+
+def fec_receive(sock, message_id=None, timeout=None):
+    sock.settimeout(timeout)
+
+    # Servers rebuild the messages of every client at once, clients only wait for their own message ID
+    messages = {}
+    while True:
+        try:
+            packet, address = sock.recvfrom(__BUFFER_SIZE)
+        except socket.timeout:
+            # More than one packet was lost in a block and nothing retransmits them
+            raise TimeoutError(f"FEC message incomplete after {timeout}s, "
+                               f"too many packets lost to be repaired") from None
+
+        # Ignore stray datagrams and late packets of a previous message
+        fields = __fec_unpack(packet)
+        if fields is None or message_id is not None and fields["message_id"] != message_id:
+            continue
+
+        # Each packet only updates its own block, the message is complete once every block is
+        key = (address, fields["peer"], fields["message_id"])
+        if key not in messages:
+            # Forget the oldest incomplete message, its missing packets will never come
+            if len(messages) >= __FEC_MAX_PENDING:
+                del messages[next(iter(messages))]
+            messages[key] = __fec_message(fields["total"], fields["block_size"])
+        data = __fec_add(messages[key], fields)
+        if data is not None:
+            return {
+                "data": data,
+                "peer": fields["peer"],
+                "message_id": fields["message_id"],
+                "block_size": fields["block_size"],
+                "router": address
+            }
+
+
+def __receive_data(sock, fec=None, message_id=None, timeout=None):
+    # Read the whole response, either from a single datagram or by rebuilding the FEC packets
+    if fec:
+        data = fec_receive(sock, message_id, timeout or __FEC_TIMEOUT)["data"]
+    else:
+        sock.settimeout(timeout)
+        try:
+            data, address = sock.recvfrom(__BUFFER_SIZE)
+        except socket.timeout:
+            raise TimeoutError(f"No response after {timeout}s") from None
 
     body_index = 0
     headers_buffer = b''
@@ -126,7 +313,7 @@ def __parse_response(headers, body):
     }
 
 
-def __request(verb, url, header, body=None, file=None, verbose=False):
+def __request(verb, url, header, body=None, file=None, verbose=False, fec=None, timeout=None, router=None):
     # Make sure we're sending a valid request
     if not isinstance(verb, HttpVerb):
         print("Invalid verb requested", verb)
@@ -192,13 +379,21 @@ def __request(verb, url, header, body=None, file=None, verbose=False):
             content += "\r\n"
 
         # Send the Request to the URI
-        __socket.sendto(content.encode(), (parsed['hostname'], parsed['port']))
+        message_id = None
+        if fec:
+            # Go through the router with one parity packet every `fec` data packets,
+            # the server answers with the same message ID so late packets of older messages are dropped
+            message_id = random.getrandbits(32)
+            peer = (socket.gethostbyname(parsed['hostname']), parsed['port'])
+            fec_send(__socket, content.encode(), peer, fec, message_id, router)
+        else:
+            __socket.sendto(content.encode(), (parsed['hostname'], parsed['port']))
 
         if verbose:
             print(f"[SENT] {verb.value} Request:\r\n\r\n{content}")
 
         # Receive the Request Response
-        headers_data, body_data = __receive_data(__socket)
+        headers_data, body_data = __receive_data(__socket, fec, message_id, timeout)
 
         if verbose:
             print(f"[SUCCESS] {verb.value} Request: Response Received")
@@ -211,6 +406,10 @@ def __request(verb, url, header, body=None, file=None, verbose=False):
         # Return the response data
         return __parse_response(headers_data.decode("utf-8"), body_data)
 
+    # Timeouts are OSErrors too, let the caller know instead of exiting
+    except TimeoutError:
+        raise
+
     except socket.error as error:
         print(f"[FAILED] {verb.value} Error:", error.strerror)
         sys.exit(1)
@@ -221,20 +420,20 @@ def __request(verb, url, header, body=None, file=None, verbose=False):
         __socket.close()
 
 
-def get(url, header=None, verbose=False):
-    return __request(HttpVerb.GET, url, header, None, None, verbose)
+def get(url, header=None, verbose=False, fec=None, timeout=None, router=None):
+    return __request(HttpVerb.GET, url, header, None, None, verbose, fec, timeout, router)
 
 
-def delete(url, header=None, verbose=False):
-    return __request(HttpVerb.DELETE, url, header, None, None, verbose)
+def delete(url, header=None, verbose=False, fec=None, timeout=None, router=None):
+    return __request(HttpVerb.DELETE, url, header, None, None, verbose, fec, timeout, router)
 
 
-def post(url, body=None, file=None, header=None, verbose=False):
-    return __request(HttpVerb.POST, url, header, body, file, verbose)
+def post(url, body=None, file=None, header=None, verbose=False, fec=None, timeout=None, router=None):
+    return __request(HttpVerb.POST, url, header, body, file, verbose, fec, timeout, router)
 
 
-def put(url, body=None, file=None, header=None, verbose=False):
-    return __request(HttpVerb.PUT, url, header, body, file, verbose)
+def put(url, body=None, file=None, header=None, verbose=False, fec=None, timeout=None, router=None):
+    return __request(HttpVerb.PUT, url, header, body, file, verbose, fec, timeout, router)
 
 
 #############################################################################################
@@ -242,6 +441,17 @@ def put(url, body=None, file=None, header=None, verbose=False):
 #############################################################################################
 
 
+# Validate the FEC block size before anything is sent
+def __fec_block_size(value):
+    try:
+        block_size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"must be an integer, got '{value}'")
+    if not 1 <= block_size <= __FEC_MAX_BLOCK_SIZE:
+        raise argparse.ArgumentTypeError(f"must be between 1 and {__FEC_MAX_BLOCK_SIZE}")
+    return block_size
+
+
 # Access a values by doing "args.host" or "args.port", etc.
 def __parse_flags():
     parser = argparse.ArgumentParser(prog="httpc")
@@ -249,16 +459,25 @@ def __parse_flags():
 
     get_parser = subparsers.add_parser(HttpVerb.GET.value, help="GET request")
     get_parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    get_parser.add_argument("--fec", help="Send through the router with one parity packet every N data packets", type=__fec_block_size)
+    get_parser.add_argument("--router-host", help="Hostname of the router used by --fec", default=__ROUTER_HOSTNAME)
+    get_parser.add_argument("--router-port", help="Port of the router used by --fec", type=int, default=__ROUTER_PORT)
     get_parser.add_argument("-H", "--headers", help="Headers to be sent using the following format: 'Key:Value'", action="append")
     get_parser.add_argument("url", help="URL to point to for the request")
 
     delete_parser = subparsers.add_parser(HttpVerb.DELETE.value, help="DELETE request")
     delete_parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    delete_parser.add_argument("--fec", help="Send through the router with one parity packet every N data packets", type=__fec_block_size)
+    delete_parser.add_argument("--router-host", help="Hostname of the router used by --fec", default=__ROUTER_HOSTNAME)
+    delete_parser.add_argument("--router-port", help="Port of the router used by --fec", type=int, default=__ROUTER_PORT)
     delete_parser.add_argument("-H", "--headers", help="Headers to be sent using the following format: 'Key:Value'", action="append")
     delete_parser.add_argument("url", help="URL to point to for the request")
 
     post_parser = subparsers.add_parser(HttpVerb.POST.value, help="POST request")
     post_parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    post_parser.add_argument("--fec", help="Send through the router with one parity packet every N data packets", type=__fec_block_size)
+    post_parser.add_argument("--router-host", help="Hostname of the router used by --fec", default=__ROUTER_HOSTNAME)
+    post_parser.add_argument("--router-port", help="Port of the router used by --fec", type=int, default=__ROUTER_PORT)
     post_parser.add_argument("-H", "--headers", help="Headers to be sent using the following format: 'Key:Value'", action="append")
     post_data_group = post_parser.add_mutually_exclusive_group()
     post_data_group.add_argument("-D", "--inlinedata", help="Inline data to be sent in the request body")
@@ -267,6 +486,9 @@ def __parse_flags():
 
     put_parser = subparsers.add_parser(HttpVerb.PUT.value, help="PUT request")
     put_parser.add_argument("-V", "--verbose", help="Activate verbose mode", action="store_true")
+    put_parser.add_argument("--fec", help="Send through the router with one parity packet every N data packets", type=__fec_block_size)
+    put_parser.add_argument("--router-host", help="Hostname of the router used by --fec", default=__ROUTER_HOSTNAME)
+    put_parser.add_argument("--router-port", help="Port of the router used by --fec", type=int, default=__ROUTER_PORT)
     put_parser.add_argument("-H", "--headers", help="Headers to be sent using the following format: 'Key:Value'", action="append")
     put_data_group = put_parser.add_mutually_exclusive_group()
     put_data_group.add_argument("-D", "--inlinedata", help="Inline data to be sent in the request body")
@@ -282,6 +504,16 @@ def __parse_flags():
                 print("[FAILED] Invalid header format. Input headers using the following format: 'Key:Value'")
                 sys.exit(1)
 
+    # Validate the body fits in an FEC message
+    if args.fec:
+        size = 0
+        if getattr(args, "inlinedata", None):
+            size = len(args.inlinedata)
+        elif getattr(args, "file", None):
+            size = os.fstat(args.file.fileno()).st_size
+        if size > __FEC_MAX_SIZE:
+            parser.error(f"argument --fec: bodies are limited to {__FEC_MAX_SIZE} bytes, got {size}")
+
     return args
 
 
@@ -306,13 +538,19 @@ if __name__ == "__main__":
     if flags.verbose:
         print(f"[ARGS] {flags.verb} Arguments: {flags}")
 
+    router = (flags.router_host, flags.router_port)
+
     # Send the request
-    match flags.verb:
-        case HttpVerb.GET.value:
-            pprint.pprint(get(flags.url, header_content, flags.verbose))
-        case HttpVerb.DELETE.value:
-            pprint.pprint(delete(flags.url, header_content, flags.verbose))
-        case HttpVerb.POST.value:
-            pprint.pprint(post(flags.url, flags.inlinedata, flags.file, header_content, flags.verbose))
-        case HttpVerb.PUT.value:
-            pprint.pprint(put(flags.url, flags.inlinedata, flags.file, header_content, flags.verbose))
+    try:
+        match flags.verb:
+            case HttpVerb.GET.value:
+                pprint.pprint(get(flags.url, header_content, flags.verbose, flags.fec, None, router))
+            case HttpVerb.DELETE.value:
+                pprint.pprint(delete(flags.url, header_content, flags.verbose, flags.fec, None, router))
+            case HttpVerb.POST.value:
+                pprint.pprint(post(flags.url, flags.inlinedata, flags.file, header_content, flags.verbose, flags.fec, None, router))
+            case HttpVerb.PUT.value:
+                pprint.pprint(put(flags.url, flags.inlinedata, flags.file, header_content, flags.verbose, flags.fec, None, router))
+    except (TimeoutError, ValueError) as error:
+        print(f"[FAILED] {flags.verb} Error:", error)
+        sys.exit(1)
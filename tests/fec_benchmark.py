@@ -0,0 +1,86 @@
+# Packages
+import argparse
+import os
+import random
+import statistics
+
+# Custom Class
+import httpc_udp
+
+
+# Constants
+MESSAGE_ID = 1
+DROP_RATES = [0.0, 0.01, 0.05, 0.1, 0.2]
+RESPONSE_SIZES = [512, 4096, 16384]
+TRIALS = 1000
+RTT = 0.010
+RETRANSMIT_TIMEOUT = 0.100
+
+# Private helpers of the UDP client
+fec_encode = getattr(httpc_udp, "__fec_encode")
+fec_decode = getattr(httpc_udp, "__fec_decode")
+
+
+# Same loss model as the router: every packet is dropped independently
+def deliver(packets, drop_rate):
+    return [packet for packet in packets if random.random() >= drop_rate]
+
+
+def lost(packet_count, drop_rate):
+    return packet_count - len(deliver(range(packet_count), drop_rate))
+
+
+# Plain retransmission: each round trip resends whatever was lost after a timeout
+def retransmission_time(packet_count, drop_rate):
+    elapsed = RTT
+    missing = lost(packet_count, drop_rate)
+    while missing:
+        elapsed += RETRANSMIT_TIMEOUT + RTT
+        missing = lost(missing, drop_rate)
+    return elapsed
+
+
+# FEC: parity repairs single losses per block, anything else falls back to retransmission
+def fec_time(data, block_size, drop_rate):
+    packets = fec_encode(data, ("127.0.0.1", 80), block_size, MESSAGE_ID)
+    received = deliver(packets, drop_rate)
+    if fec_decode(received, MESSAGE_ID) is not None:
+        return RTT
+
+    # Resend the packets that are still missing once the timeout expires
+    missing = len(packets) - len(received)
+    return RTT + RETRANSMIT_TIMEOUT + retransmission_time(missing, drop_rate)
+
+
+def percentile(samples, rank):
+    ordered = sorted(samples)
+    return ordered[max(0, int(round(rank * len(ordered))) - 1)]
+
+
+def run_benchmark(block_size, seed):
+    random.seed(seed)
+    chunk_size = getattr(httpc_udp, "__FEC_CHUNK_SIZE")
+
+    print(f"{'size':>6} {'drop':>5} | {'retransmit mean/p99 (ms)':>25} | {'fec mean/p99 (ms)':>20} | {'overhead':>8}")
+    for size in RESPONSE_SIZES:
+        data = os.urandom(size)
+        packet_count = -(-size // chunk_size)
+        overhead = len(fec_encode(data, ("127.0.0.1", 80), block_size, MESSAGE_ID)) / packet_count - 1
+
+        for drop_rate in DROP_RATES:
+            plain = [retransmission_time(packet_count, drop_rate) * 1000 for _ in range(TRIALS)]
+            fec = [fec_time(data, block_size, drop_rate) * 1000 for _ in range(TRIALS)]
+            print(f"{size:>6} {drop_rate:>5.2f} | "
+                  f"{statistics.mean(plain):>12.1f} / {percentile(plain, 0.99):>8.1f} | "
+                  f"{statistics.mean(fec):>8.1f} / {percentile(fec, 0.99):>8.1f} | "
+                  f"{overhead:>7.0%}")
+
+
+# Benchmark Entry Point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="fec_benchmark")
+    parser.add_argument("--fec", help="Data packets per parity packet", type=int, default=4)
+    parser.add_argument("--seed", help="Seed of the simulated packet loss", type=int, default=1)
+    args = parser.parse_args()
+
+    run_benchmark(args.fec, args.seed)
@@ -0,0 +1,65 @@
+# Packages
+import unittest
+
+# Custom Class
+import httpc_bench
+
+
+# Private helpers of the load generator
+histogram_index = getattr(httpc_bench, "__histogram_index")
+histogram_value = getattr(httpc_bench, "__histogram_value")
+record = getattr(httpc_bench, "__record")
+merge = getattr(httpc_bench, "__merge")
+percentile = getattr(httpc_bench, "__percentile")
+sub_buckets = getattr(httpc_bench, "__HISTOGRAM_SUB_BUCKETS")
+
+# Constants
+VALUES = list(range(0, 2048)) + [10 ** exponent + offset for exponent in range(4, 10) for offset in (-1, 0, 1)]
+
+
+class HistogramTest(unittest.TestCase):
+    def test_small_values_are_exact(self):
+        for value in range(sub_buckets):
+            self.assertEqual(histogram_value(histogram_index(value)), value)
+
+    def test_bucket_contains_value(self):
+        for value in VALUES:
+            index = histogram_index(value)
+            # The value is below its bucket's upper bound and above the previous one
+            self.assertLessEqual(value, histogram_value(index))
+            if index:
+                self.assertGreater(value, histogram_value(index - 1))
+
+    def test_precision(self):
+        for value in VALUES[1:]:
+            self.assertLessEqual(histogram_value(histogram_index(value)) - value, value / sub_buckets)
+
+    def test_indexes_are_monotonic(self):
+        indexes = [histogram_index(value) for value in sorted(VALUES)]
+        self.assertEqual(indexes, sorted(indexes))
+
+    def test_merge_sums_counts(self):
+        first, second = {}, {}
+        for latency in [0.001, 0.002, 0.002]:
+            record(first, latency)
+        for latency in [0.002, 0.5]:
+            record(second, latency)
+
+        merged = merge([first, second])
+        self.assertEqual(sum(merged.values()), 5)
+        self.assertEqual(merged[histogram_index(2000)], 3)
+        self.assertEqual(merged[histogram_index(500000)], 1)
+
+    def test_percentile(self):
+        histogram = {}
+        for microseconds in range(1, 101):
+            record(histogram, microseconds / 1_000_000)
+
+        self.assertEqual(percentile(histogram, 50), 50 / 1_000_000)
+        self.assertEqual(percentile(histogram, 99), 99 / 1_000_000)
+        self.assertEqual(percentile({}, 99), 0)
+
+
+# Tests Entry Point
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,189 @@
+# Packages
+import http.server
+import json
+import os
+import random
+import tempfile
+import threading
+import unittest
+
+# Custom Class
+import httpc_tcp
+
+
+# Private helpers of the TCP client
+load_progress = getattr(httpc_tcp, "__load_progress")
+
+# Constants
+URL = "http://localhost/file.bin"
+VALIDATOR = '"v1"'
+HOSTNAME = "127.0.0.1"
+CONTENT = random.Random(0).randbytes(100_000)
+LAST_MODIFIED = "Mon, 19 Oct 2026 10:00:00 GMT"
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    # Overridden by every test
+    status = 200
+    ranges = True
+    etag = None
+    last_modified = None
+    requests = []
+
+    def send_file_headers(self, status, length):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        if self.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        if self.last_modified:
+            self.send_header("Last-Modified", self.last_modified)
+
+    def do_HEAD(self):
+        self.send_file_headers(self.status, len(CONTENT))
+        self.end_headers()
+
+    def do_GET(self):
+        self.requests.append(dict(self.headers))
+
+        # If-Range only matches a strong ETag or the exact modification date
+        if_range = self.headers.get("If-Range")
+        matches = if_range is None or if_range == self.last_modified or (
+            if_range == self.etag and not self.etag.startswith("W/"))
+
+        if self.ranges and matches and self.headers.get("Range"):
+            start, end = map(int, self.headers["Range"][len("bytes="):].split("-"))
+            self.send_file_headers(206, end - start + 1)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(CONTENT)}")
+            self.end_headers()
+            self.wfile.write(CONTENT[start:end + 1])
+        else:
+            self.send_file_headers(200, len(CONTENT))
+            self.end_headers()
+            self.wfile.write(CONTENT)
+
+    def log_message(self, *args):
+        pass
+
+
+class LoadProgressTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "file.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_partial(self, size, progress):
+        with open(self.output, "wb") as output_file:
+            output_file.truncate(size)
+        with open(self.output + ".part", "w") as progress_file:
+            json.dump(progress, progress_file)
+
+    def test_splits_contiguous_ranges(self):
+        progress = load_progress(self.output, URL, 10, VALIDATOR, 3)
+        ranges = [(segment["start"], segment["end"], segment["done"]) for segment in progress["segments"]]
+        self.assertEqual(ranges, [(0, 3, 0), (4, 7, 0), (8, 9, 0)])
+        self.assertEqual((progress["url"], progress["size"], progress["validator"]), (URL, 10, VALIDATOR))
+
+    def test_more_segments_than_bytes(self):
+        progress = load_progress(self.output, URL, 2, VALIDATOR, 8)
+        ranges = [(segment["start"], segment["end"]) for segment in progress["segments"]]
+        self.assertEqual(ranges, [(0, 0), (1, 1)])
+
+    def test_resumes_same_resource(self):
+        saved = load_progress(self.output, URL, 10, VALIDATOR, 2)
+        saved["segments"][0]["done"] = 3
+        self.write_partial(10, saved)
+        self.assertEqual(load_progress(self.output, URL, 10, VALIDATOR, 2), saved)
+
+    def test_restarts_changed_resource(self):
+        saved = load_progress(self.output, URL, 10, VALIDATOR, 2)
+        saved["segments"][0]["done"] = 3
+        self.write_partial(10, saved)
+
+        for url, validator in [(URL, '"v2"'), ("http://localhost/other.bin", VALIDATOR), (URL, None)]:
+            progress = load_progress(self.output, url, 10, validator, 2)
+            self.assertEqual([segment["done"] for segment in progress["segments"]], [0, 0])
+
+    def test_restarts_resized_output(self):
+        saved = load_progress(self.output, URL, 10, VALIDATOR, 2)
+        saved["segments"][0]["done"] = 3
+        self.write_partial(12, saved)
+        progress = load_progress(self.output, URL, 10, VALIDATOR, 2)
+        self.assertEqual([segment["done"] for segment in progress["segments"]], [0, 0])
+
+    def test_restarts_corrupted_progress(self):
+        with open(self.output, "wb") as output_file:
+            output_file.truncate(10)
+        with open(self.output + ".part", "w") as progress_file:
+            progress_file.write("{not json")
+        progress = load_progress(self.output, URL, 10, VALIDATOR, 2)
+        self.assertEqual([segment["done"] for segment in progress["segments"]], [0, 0])
+
+
+class DownloadTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, "file.bin")
+        self.server = None
+
+    def tearDown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        self.directory.cleanup()
+
+    def serve(self, **settings):
+        handler = type("TestHandler", (Handler,), {**settings, "requests": []})
+        self.server = http.server.ThreadingHTTPServer((HOSTNAME, 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return handler, f"http://{HOSTNAME}:{self.server.server_address[1]}/file.bin"
+
+    def download(self, url):
+        response = httpc_tcp.download(url, self.output, segments=4, timeout=5)
+        self.assertEqual(response["body"], self.output)
+        with open(self.output, "rb") as output_file:
+            self.assertEqual(output_file.read(), CONTENT)
+        self.assertFalse(os.path.exists(self.output + ".part"))
+
+    def test_strong_etag(self):
+        handler, url = self.serve(etag='"v1"', last_modified=LAST_MODIFIED)
+        self.download(url)
+        self.assertEqual(len(handler.requests), 4)
+        self.assertEqual({request.get("If-Range") for request in handler.requests}, {'"v1"'})
+
+    def test_weak_etag_uses_last_modified(self):
+        handler, url = self.serve(etag='W/"v1"', last_modified=LAST_MODIFIED)
+        self.download(url)
+        self.assertEqual({request.get("If-Range") for request in handler.requests}, {LAST_MODIFIED})
+
+    def test_weak_etag_without_last_modified(self):
+        handler, url = self.serve(etag='W/"v1"')
+        self.download(url)
+        self.assertEqual(len(handler.requests), 4)
+        self.assertEqual({request.get("If-Range") for request in handler.requests}, {None})
+
+    def test_head_error(self):
+        handler, url = self.serve(status=404, etag='"v1"')
+        with self.assertRaisesRegex(httpc_tcp.HttpError, "404"):
+            httpc_tcp.download(url, self.output, timeout=5)
+        self.assertEqual(handler.requests, [])
+        self.assertFalse(os.path.exists(self.output))
+
+    def test_fallback_removes_stale_progress(self):
+        # Leftover of a segmented attempt from when the server still supported ranges
+        with open(self.output + ".part", "w") as progress_file:
+            json.dump(load_progress(self.output, "", len(CONTENT), VALIDATOR, 4), progress_file)
+
+        handler, url = self.serve(ranges=False, etag='"v1"')
+        self.download(url)
+        self.assertEqual(len(handler.requests), 1)
+
+
+# Tests Entry Point
+if __name__ == "__main__":
+    unittest.main()
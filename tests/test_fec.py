@@ -0,0 +1,152 @@
+# Packages
+import json
+import random
+import socket
+import threading
+import unittest
+
+# Custom Class
+import httpc_udp
+
+
+# Private helpers of the UDP client
+fec_encode = getattr(httpc_udp, "__fec_encode")
+fec_decode = getattr(httpc_udp, "__fec_decode")
+fec_unpack = getattr(httpc_udp, "__fec_unpack")
+fec_message = getattr(httpc_udp, "__fec_message")
+fec_add = getattr(httpc_udp, "__fec_add")
+chunk_size = getattr(httpc_udp, "__FEC_CHUNK_SIZE")
+packet_header = getattr(httpc_udp, "__PACKET_HEADER")
+
+# Constants
+PEER = ("127.0.0.1", 8080)
+MESSAGE_ID = 42
+BLOCK_SIZE = 4
+SIZES = [0, 1, chunk_size - 1, chunk_size, chunk_size + 1, 10 * chunk_size + 7]
+HOSTNAME = "127.0.0.1"
+
+
+def data_of(size):
+    # Deterministic content so failures can be reproduced
+    return random.Random(size).randbytes(size)
+
+
+class FecTest(unittest.TestCase):
+    def test_round_trip(self):
+        for size in SIZES:
+            data = data_of(size)
+            packets = fec_encode(data, PEER, BLOCK_SIZE, MESSAGE_ID)
+            self.assertTrue(all(len(packet) <= 1024 for packet in packets))
+            self.assertEqual(fec_decode(packets, MESSAGE_ID), data)
+            self.assertEqual(fec_decode(list(reversed(packets)), MESSAGE_ID), data)
+
+    def test_repairs_one_loss_per_block(self):
+        data = data_of(10 * chunk_size + 7)
+        packets = fec_encode(data, PEER, BLOCK_SIZE, MESSAGE_ID)
+
+        # Every block is its data packets followed by one parity packet
+        for position in range(BLOCK_SIZE + 1):
+            received = [packet for index, packet in enumerate(packets) if index % (BLOCK_SIZE + 1) != position]
+            self.assertEqual(fec_decode(received, MESSAGE_ID), data)
+
+    def test_two_losses_in_a_block_are_not_repaired(self):
+        packets = fec_encode(data_of(10 * chunk_size), PEER, BLOCK_SIZE, MESSAGE_ID)
+        self.assertIsNone(fec_decode(packets[2:], MESSAGE_ID))
+
+    def test_ignores_other_messages(self):
+        data = data_of(3 * chunk_size)
+        packets = fec_encode(data, PEER, BLOCK_SIZE, MESSAGE_ID)
+        stale = fec_encode(data_of(3 * chunk_size + 1), PEER, BLOCK_SIZE, MESSAGE_ID + 1)
+
+        received = stale + packets[1:] + [b"junk"]
+        self.assertEqual(fec_decode(received, MESSAGE_ID), data)
+        self.assertIsNone(fec_decode(stale, MESSAGE_ID))
+
+    def test_incremental(self):
+        data = data_of(10 * chunk_size + 7)
+        packets = fec_encode(data, PEER, BLOCK_SIZE, MESSAGE_ID)
+        # Lose the first data packet of every block, the parity rebuilds it when it arrives
+        received = [fec_unpack(packet) for index, packet in enumerate(packets) if index % (BLOCK_SIZE + 1)]
+
+        message = fec_message(received[0]["total"], received[0]["block_size"])
+        results = [fec_add(message, packet) for packet in received]
+        self.assertEqual(results[:-1], [None] * (len(received) - 1))
+        self.assertEqual(results[-1], data)
+
+    def test_rejects_invalid_block_size(self):
+        for block_size in [0, -1, 256]:
+            with self.assertRaises(ValueError):
+                fec_encode(b"data", PEER, block_size, MESSAGE_ID)
+
+
+class Router:
+    # Same forwarding as the router: swap the peer in the header for the sender and drop some packets
+    def __init__(self, drop_every):
+        self.drop_every = drop_every
+        self.forwarded = {}
+        self.dropped = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((HOSTNAME, 0))
+        self.address = self.sock.getsockname()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        while True:
+            try:
+                packet, sender = self.sock.recvfrom(1024)
+            except OSError:
+                return
+            _, _, address, port = packet_header.unpack_from(packet)
+            peer = (socket.inet_ntoa(address), port)
+
+            # Lose one packet out of every drop_every packets going to each peer
+            count = self.forwarded.get(peer, 0)
+            self.forwarded[peer] = count + 1
+            if count % self.drop_every == 1:
+                self.dropped += 1
+                continue
+
+            start = packet_header.size - 6
+            rewritten = packet[:start] + socket.inet_aton(sender[0]) + sender[1].to_bytes(2, "big") + packet[start + 6:]
+            self.sock.sendto(rewritten, peer)
+
+
+class FecRouterTest(unittest.TestCase):
+    def setUp(self):
+        self.router = Router(BLOCK_SIZE + 1)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind((HOSTNAME, 0))
+        self.padding = data_of(10 * chunk_size).hex()
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def tearDown(self):
+        self.router.sock.close()
+        self.server.close()
+
+    def serve(self):
+        # Rebuild the request and answer with a response spanning several blocks
+        while True:
+            try:
+                message = httpc_udp.fec_receive(self.server)
+            except OSError:
+                return
+            body = json.dumps({"request": message["data"].decode(), "padding": self.padding})
+            response = f"HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n\r\n{body}".encode()
+            httpc_udp.fec_send(self.server, response, message["peer"], message["block_size"],
+                               message["message_id"], message["router"])
+
+    def test_round_trip_through_router(self):
+        url = f"http://{HOSTNAME}:{self.server.getsockname()[1]}/fec?test=1"
+        response = httpc_udp.post(url, "x" * (3 * chunk_size), fec=BLOCK_SIZE, timeout=2, router=self.router.address)
+
+        self.assertEqual(response["status_code"], "200")
+        self.assertTrue(response["body"]["request"].startswith("POST /fec?test=1 HTTP/1.1\r\n"))
+        self.assertIn("x" * (3 * chunk_size), response["body"]["request"])
+        self.assertEqual(response["body"]["padding"], self.padding)
+        # Both the request and the response lost packets that the parity repaired
+        self.assertGreater(self.router.dropped, 2)
+
+
+# Tests Entry Point
+if __name__ == "__main__":
+    unittest.main()
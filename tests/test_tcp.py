@@ -0,0 +1,257 @@
+# Packages
+import socket
+import threading
+import time
+import unittest
+
+# Custom Class
+import httpc_tcp
+
+
+# Private state of the TCP client
+latencies = getattr(httpc_tcp, "__latencies")
+EXPECT_TIMEOUT = "__EXPECT_CONTINUE_TIMEOUT"
+
+# Constants
+HOSTNAME = "127.0.0.1"
+RESPONSE = b"HTTP/1.1 200 OK\r\nContent-Length: 11\r\n\r\n{\"ok\": 1}\r\n"
+CONTINUE = b"HTTP/1.1 100 Continue\r\n\r\n"
+BODY = "x" * 100
+
+
+def read_request(conn):
+    # Read up to the end of the headers, some of the body may come along
+    data = b''
+    while b'\r\n\r\n' not in data:
+        chunk = conn.recv(1024)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def read_body(conn, data):
+    # Read whatever is left of the body announced by the request's Content-Length
+    head, body = data.split(b'\r\n\r\n', 1)
+    length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+    while len(body) < length:
+        chunk = conn.recv(1024)
+        if not chunk:
+            break
+        body += chunk
+    return body
+
+
+def stall(conn):
+    # Never answer, only return once the client gave up on the connection
+    while conn.recv(1024):
+        pass
+
+
+class Server:
+    # Raw TCP server calling handler(connection, index) for every accepted connection
+    def __init__(self, handler):
+        self.handler = handler
+        self.connections = []
+        self.listener = socket.create_server((HOSTNAME, 0))
+        self.url = f"http://{HOSTNAME}:{self.listener.getsockname()[1]}/"
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections.append(conn)
+            threading.Thread(target=self.handle, args=(conn, len(self.connections)), daemon=True).start()
+
+    def handle(self, conn, index):
+        try:
+            self.handler(conn, index)
+        except OSError:
+            pass
+
+    def close(self):
+        self.listener.close()
+        for conn in self.connections:
+            conn.close()
+
+
+class RequestTest(unittest.TestCase):
+    def setUp(self):
+        # Start from the default hedging delay whatever ran before
+        latencies.clear()
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+
+    def serve(self, handler):
+        server = Server(handler)
+        self.servers.append(server)
+        return server
+
+    def test_response(self):
+        def respond(conn, index):
+            read_request(conn)
+            conn.sendall(RESPONSE)
+
+        response = httpc_tcp.get(self.serve(respond).url, timeout=2)
+        self.assertEqual((response["status_code"], response["body"]), ("200", {"ok": 1}))
+
+    def test_deadline(self):
+        server = self.serve(lambda conn, index: stall(conn))
+
+        start = time.monotonic()
+        with self.assertRaises(httpc_tcp.HttpTimeoutError):
+            httpc_tcp.get(server.url, timeout=0.3)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_connection_error_raises(self):
+        # Grab a free port and close it so nothing listens there
+        with socket.create_server((HOSTNAME, 0)) as listener:
+            port = listener.getsockname()[1]
+
+        with self.assertRaises(httpc_tcp.HttpError):
+            httpc_tcp.get(f"http://{HOSTNAME}:{port}/", timeout=2)
+
+    def test_hedged_duplicate_wins(self):
+        def respond_second(conn, index):
+            read_request(conn)
+            if index == 1:
+                stall(conn)
+            else:
+                conn.sendall(RESPONSE)
+
+        server = self.serve(respond_second)
+        start = time.monotonic()
+        response = httpc_tcp.get(server.url, timeout=3, hedge=True)
+        self.assertEqual(response["status_code"], "200")
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(len(server.connections), 2)
+
+    def test_hedged_deadline(self):
+        server = self.serve(lambda conn, index: stall(conn))
+
+        # The duplicate is sent after the default delay but must not get a fresh timeout
+        start = time.monotonic()
+        with self.assertRaises(httpc_tcp.HttpTimeoutError):
+            httpc_tcp.get(server.url, timeout=0.8, hedge=True)
+        self.assertLess(time.monotonic() - start, 1.1)
+        self.assertEqual(len(server.connections), 2)
+
+    def test_hedged_no_duplicate_after_deadline(self):
+        server = self.serve(lambda conn, index: stall(conn))
+
+        start = time.monotonic()
+        with self.assertRaises(httpc_tcp.HttpTimeoutError):
+            httpc_tcp.get(server.url, timeout=0.3, hedge=True)
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(len(server.connections), 1)
+
+    def test_hedged_unexpected_error(self):
+        def respond_binary(conn, index):
+            read_request(conn)
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n\xff\xfe")
+
+        # The error of the attempt reaches the caller instead of blocking it
+        start = time.monotonic()
+        with self.assertRaises(UnicodeDecodeError):
+            httpc_tcp.get(self.serve(respond_binary).url, timeout=2, hedge=True)
+        self.assertLess(time.monotonic() - start, 1)
+
+
+class ExpectContinueTest(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+        self.requests = []
+        self.bodies = []
+        # Don't wait a whole second for servers that ignore the expectation
+        timeout = getattr(httpc_tcp, EXPECT_TIMEOUT)
+        setattr(httpc_tcp, EXPECT_TIMEOUT, 0.2)
+        self.addCleanup(setattr, httpc_tcp, EXPECT_TIMEOUT, timeout)
+
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+
+    def post(self, handler):
+        server = Server(handler)
+        self.servers.append(server)
+        return httpc_tcp.post(server.url, BODY, timeout=3, expect_continue=10)
+
+    def test_continue(self):
+        def approve(conn, index):
+            data = read_request(conn)
+            self.requests.append(data)
+            conn.sendall(CONTINUE)
+            self.bodies.append(read_body(conn, data))
+            conn.sendall(RESPONSE)
+
+        self.assertEqual(self.post(approve)["status_code"], "200")
+        self.assertIn(b"Expect: 100-continue\r\n", self.requests[0])
+        self.assertTrue(self.bodies[0].startswith(BODY.encode()))
+
+    def test_rejected(self):
+        for status in [b"413 Content Too Large", b"401 Unauthorized"]:
+            def reject(conn, index):
+                read_request(conn)
+                conn.sendall(b"HTTP/1.1 " + status + b"\r\nContent-Length: 0\r\n\r\n")
+                # The body is never uploaded, the client closes the connection instead
+                self.bodies.append(conn.recv(1024))
+
+            response = self.post(reject)
+            self.assertEqual(response["status_code"], status[:3].decode())
+            time.sleep(0.1)
+            self.assertEqual(self.bodies[-1], b"")
+
+    def test_expectation_failed(self):
+        def refuse_first(conn, index):
+            data = read_request(conn)
+            self.requests.append(data)
+            if index == 1:
+                conn.sendall(b"HTTP/1.1 417 Expectation Failed\r\nContent-Length: 0\r\n\r\n")
+                return
+            self.bodies.append(read_body(conn, data))
+            conn.sendall(RESPONSE)
+
+        # The request is sent again on a new connection without the expectation
+        self.assertEqual(self.post(refuse_first)["status_code"], "200")
+        self.assertEqual(len(self.requests), 2)
+        self.assertNotIn(b"Expect:", self.requests[1])
+        self.assertTrue(self.bodies[0].startswith(BODY.encode()))
+
+    def test_no_interim_response(self):
+        def ignore(conn, index):
+            self.bodies.append(read_body(conn, read_request(conn)))
+            conn.sendall(RESPONSE)
+
+        self.assertEqual(self.post(ignore)["status_code"], "200")
+        self.assertTrue(self.bodies[0].startswith(BODY.encode()))
+
+    def test_late_continue(self):
+        def approve_late(conn, index):
+            data = read_request(conn)
+            self.bodies.append(read_body(conn, data))
+            # The interim response only arrives once the client already sent the body
+            conn.sendall(CONTINUE + RESPONSE)
+
+        response = self.post(approve_late)
+        self.assertEqual((response["status_code"], response["body"]), ("200", {"ok": 1}))
+
+    def test_early_hints(self):
+        def hint(conn, index):
+            data = read_request(conn)
+            conn.sendall(b"HTTP/1.1 103 Early Hints\r\nLink: </style.css>\r\n\r\n" + CONTINUE)
+            self.bodies.append(read_body(conn, data))
+            conn.sendall(RESPONSE)
+
+        self.assertEqual(self.post(hint)["status_code"], "200")
+        self.assertTrue(self.bodies[0].startswith(BODY.encode()))
+
+
+# Tests Entry Point
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# Packages
+import http.server
+import shutil
+import ssl
+import tempfile
+import threading
+import unittest
+
+# Custom Class
+import httpc_tcp
+from tls_benchmark import HOSTNAME, Handler, create_certificate
+
+
+# Private state of the TCP client
+sessions = getattr(httpc_tcp, "__tls_sessions")
+
+
+class ResumingHandler(Handler):
+    # Whether the server resumed the session of every request
+    resumed = []
+
+    def do_GET(self):
+        self.resumed.append(self.connection.session_reused)
+        super().do_GET()
+
+
+@unittest.skipUnless(shutil.which("openssl"), "openssl is required to create the test certificate")
+class TlsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.certificate, cls.key = create_certificate(cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def setUp(self):
+        sessions.clear()
+        ResumingHandler.resumed = []
+        self.server = http.server.ThreadingHTTPServer((HOSTNAME, 0), ResumingHandler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.certificate, self.key)
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"https://{HOSTNAME}:{self.server.server_address[1]}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_shared_context(self):
+        context = httpc_tcp.tls_context(self.certificate)
+        self.assertIs(httpc_tcp.tls_context(self.certificate), context)
+        self.assertIsNot(httpc_tcp.tls_context(self.certificate, False), context)
+
+    def test_session_resumed(self):
+        context = httpc_tcp.tls_context(self.certificate)
+        for _ in range(2):
+            self.assertEqual(httpc_tcp.get(self.url, timeout=5, context=context)["body"], {"ok": True})
+        self.assertEqual(ResumingHandler.resumed, [False, True])
+
+    def test_session_resumed_tls12(self):
+        # Separate context so the shared one keeps its settings
+        context = ssl.create_default_context(cafile=self.certificate)
+        context.maximum_version = ssl.TLSVersion.TLSv1_2
+        for _ in range(2):
+            httpc_tcp.get(self.url, timeout=5, context=context)
+        self.assertEqual(ResumingHandler.resumed, [False, True])
+
+
+# Tests Entry Point
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# Packages
+import argparse
+import http.server
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+
+# Custom Class
+import httpc_tcp
+
+
+# Constants
+REQUESTS = 200
+HOSTNAME = "localhost"
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# Self-signed certificate for the local server
+def create_certificate(directory):
+    certificate = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-subj", f"/CN={HOSTNAME}", "-addext", f"subjectAltName=DNS:{HOSTNAME}",
+        "-keyout", key, "-out", certificate
+    ], check=True, capture_output=True)
+    return certificate, key
+
+
+def start_server(certificate, key):
+    server = http.server.ThreadingHTTPServer((HOSTNAME, 0), Handler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certificate, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(url, context, resume):
+    sessions = getattr(httpc_tcp, "__tls_sessions")
+    sessions.clear()
+
+    samples = []
+    for _ in range(REQUESTS):
+        # Forgetting the previous session forces a full handshake
+        if not resume:
+            sessions.clear()
+        start = time.perf_counter()
+        httpc_tcp.get(url, context=context)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run_benchmark(tls_version):
+    with tempfile.TemporaryDirectory() as directory:
+        certificate, key = create_certificate(directory)
+        server = start_server(certificate, key)
+        url = f"https://{HOSTNAME}:{server.server_address[1]}/"
+
+        # Own context since the shared ones must keep their settings for every other caller
+        context = ssl.create_default_context(cafile=certificate)
+        context.maximum_version = tls_version
+
+        try:
+            # Warm up the server and the context
+            httpc_tcp.get(url, context=context)
+
+            print(f"{'mode':>10} | {'mean (ms)':>10} | {'p50 (ms)':>10} | {'p99 (ms)':>10}")
+            for name, resume in [("full", False), ("resumed", True)]:
+                samples = sorted(measure(url, context, resume))
+                print(f"{name:>10} | {statistics.mean(samples):>10.3f} | "
+                      f"{samples[len(samples) // 2]:>10.3f} | {samples[int(len(samples) * 0.99) - 1]:>10.3f}")
+        finally:
+            server.shutdown()
+
+
+# Benchmark Entry Point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="tls_benchmark")
+    parser.add_argument("--tls", help="Highest TLS version to negotiate", choices=["1.2", "1.3"], default="1.3")
+    args = parser.parse_args()
+
+    run_benchmark(ssl.TLSVersion.TLSv1_3 if args.tls == "1.3" else ssl.TLSVersion.TLSv1_2)